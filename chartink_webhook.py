@@ -1,16 +1,26 @@
-import json
+import math
 import os
+import re
+import hashlib
+import random
 import time
 import sys
+import queue
+import threading
 import pytz
 from datetime import datetime, timedelta, date
-from flask import Flask, request, jsonify, redirect, send_from_directory, render_template_string
+from dataclasses import dataclass
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, defaultdict, OrderedDict
+from flask import Flask, Response, request, jsonify, redirect, abort
+from jinja2 import Environment
 from dotenv import load_dotenv
 from scheduler import start_scheduler, is_market_open, calculate_next_market_open
 from nse_holidays import is_market_holiday, get_next_trading_day
 from token_manager import token_manager
 from memory_optimizer import MemoryOptimizer  # Add proper import
-from functools import wraps
+from functools import wraps, lru_cache
 from flask_cors import CORS
 from logger import get_logger  # Import our centralized logger
 
@@ -24,6 +34,26 @@ load_dotenv()
 # This will work regardless of how the app is started (gunicorn or directly)
 BYPASS_MARKET_HOURS = os.getenv("BYPASS_MARKET_HOURS", "False").lower() == "true"
 
+# Maximum number of orders placed concurrently for a single alert; the Kite rate limiter
+# still spaces the actual API calls, so extra workers only overlap network latency
+ORDER_WORKERS = max(1, int(os.getenv("ORDER_WORKERS", "8")))
+
+# Scan name keywords that mark an alert as a SELL signal (matched anywhere, case-insensitively)
+SELL_PATTERN = re.compile(r"sell|short|bearish|breakdown|down", re.IGNORECASE)
+
+# Stop-loss order pricing: trigger 3% beyond the reference price, limit a further 1% beyond the trigger
+SL_SELL_TRIGGER_FACTOR = 0.97
+SL_SELL_LIMIT_FACTOR = 0.99
+SL_BUY_TRIGGER_FACTOR = 1.03
+SL_BUY_LIMIT_FACTOR = 1.01
+
+# Browser cache lifetime for the dashboard HTML pages (they are revalidated via ETag afterwards)
+STATIC_PAGE_MAX_AGE = 300
+
+# Exchanges accepted as a symbol prefix (e.g. "NFO:NIFTY24APRFUT"); unprefixed symbols trade on NSE
+EXCHANGES = {"NSE", "NFO", "BSE"}
+EXCHANGE_PREFIXES = tuple(f"{exchange}:" for exchange in sorted(EXCHANGES))  # For a single startswith() check
+
 # Set IST timezone
 IST = pytz.timezone('Asia/Kolkata')
 
@@ -108,6 +138,31 @@ MARKET_CLOSED_HTML = """
 </html>
 """
 
+# Compiled once at import; render_template_string would re-parse the template on every request
+MARKET_CLOSED_TEMPLATE = Environment(autoescape=True).from_string(MARKET_CLOSED_HTML)
+
+# Static dashboard pages, read once per process and served from memory
+AUTH_PAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'auth')
+
+@lru_cache(maxsize=16)
+def load_auth_page(name):
+    """Read an auth page and compute its ETag (cached for the life of the process)"""
+    with open(os.path.join(AUTH_PAGES_DIR, name), 'rb') as f:
+        body = f.read()
+    return body, hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def serve_auth_page(name):
+    """Serve a cached auth page, answering 304 when the browser already has this version"""
+    try:
+        body, etag = load_auth_page(name)
+    except FileNotFoundError:
+        abort(404)  # Same as send_from_directory for a missing page
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_PAGE_MAX_AGE
+    return response.make_conditional(request)
+
 # Check if we're in minimal mode (market closed)
 MARKET_MODE = os.getenv("MARKET_MODE", "FULL").upper()
 IS_MINIMAL_MODE = MARKET_MODE == "MINIMAL"
@@ -168,8 +223,7 @@ def create_market_closed_app():
                 closure_reason = "Current time is outside regular trading hours (9:00 AM - 3:30 PM IST)"
             
             # Render the template with current context
-            return render_template_string(
-                MARKET_CLOSED_HTML,
+            return MARKET_CLOSED_TEMPLATE.render(
                 current_time=current_time,
                 next_open_time=next_open_time,
                 closure_reason=closure_reason
@@ -206,7 +260,7 @@ def create_market_closed_app():
     @minimal_app.route('/auth/refresh')
     def auth_refresh():
         """Show the token refresh page"""
-        return send_from_directory('auth', 'refresh.html')
+        return serve_auth_page('refresh.html')
     
     # Log once when creating the app
     logger.info("Created minimal application for market-closed hours")
@@ -230,7 +284,7 @@ def market_closed_check(path):
     
     # If in minimal mode and not an allowed path, show market closed page
     if IS_MINIMAL_MODE and not any(path.startswith(route) for route in ALWAYS_ALLOWED):
-        return render_template_string(MARKET_CLOSED_HTML)
+        return MARKET_CLOSED_TEMPLATE.render()
     
     # Otherwise, the route will be handled by other functions
     return None  # Let other routes handle this
@@ -241,7 +295,7 @@ def index():
     Serve the index page. Show market closed page if in minimal mode.
     """
     if IS_MINIMAL_MODE:
-        return render_template_string(MARKET_CLOSED_HTML)
+        return MARKET_CLOSED_TEMPLATE.render()
         
     # Normal index page logic
     try:
@@ -262,20 +316,11 @@ if not BYPASS_MARKET_HOURS and not is_market_open():
     if is_market_holiday(now.date()):
         # Import only what we need to avoid circular imports
         try:
-            from telegram_notifier import TelegramNotifier
-            from nse_holidays import fetch_nse_holidays
-            
-            # Initialize Telegram notifier
-            telegram = TelegramNotifier()
+            from telegram_notifier import telegram_notifier as telegram
+            from nse_holidays import get_holiday_name
             
-            # Get holiday description
-            holidays = fetch_nse_holidays()
-            date_str = now.strftime('%Y-%m-%d')
-            holiday_desc = "Holiday"
-            for holiday in holidays:
-                if holiday.get('date') == date_str:
-                    holiday_desc = holiday.get('description', 'Holiday')
-                    break
+            # Get holiday description (a direct lookup in the holiday table)
+            holiday_desc = get_holiday_name(now.date()) or "Holiday"
             
             # Calculate next market open
             next_market_open = calculate_next_market_open()
@@ -305,13 +350,19 @@ else:
     
     # Only import required modules when the market is open
     from kite_connect import KiteConnect
-    from kite_rate_limiter import get_rate_limited_kite  # Import the rate limiter
-    from telegram_notifier import TelegramNotifier
+    from kite_rate_limiter import get_rate_limited_kite, TokenBucket  # Import the rate limiter
+    from telegram_notifier import TelegramNotifier, telegram_notifier
     from apscheduler.schedulers.background import BackgroundScheduler
     from file_storage import storage
+    from json_provider import OrjsonProvider, dumps_line
+    from werkzeug.middleware.proxy_fix import ProxyFix
     
     # Initialize Flask app
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)  # Use orjson for request parsing and jsonify
+    # Railway's proxy appends the real client address to X-Forwarded-For; trust only that one hop,
+    # so request.remote_addr can't be chosen by the client
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
 
     # Register token status endpoints
     try:
@@ -326,29 +377,214 @@ else:
     kite = get_rate_limited_kite(kite_base)  # Apply rate limiting to the Kite instance
 
     # Initialize Telegram notifier
-    telegram = TelegramNotifier()
+    telegram = telegram_notifier  # Shared with token_manager's notifications
+
+    # Background worker threads are started on first use, so a gunicorn worker forked
+    # from a process that already imported the app starts its own copies
+    _background_threads = {}
+    _background_lock = threading.Lock()
+
+    def ensure_background_thread(name, target):
+        """Start the named daemon thread if it isn't running in this process"""
+        thread = _background_threads.get(name)
+        if thread is not None and thread.is_alive():
+            return
+        
+        with _background_lock:
+            thread = _background_threads.get(name)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=target, name=name, daemon=True)
+                thread.start()
+                _background_threads[name] = thread
+
+    # Trade log entries are appended by a background writer so file I/O stays off the alert path
+    TRADE_LOG_FILE = os.path.join(os.getcwd(), 'logs', "trade_log.json")  # Path that's writable in Railway
+    TRADE_LOG_BATCH_SIZE = 100
+    _trade_log_queue = queue.SimpleQueue()
+
+    def _write_lines(fd, lines):
+        """Append lines to fd, gathering them into one writev() call where available"""
+        if not hasattr(os, "writev"):
+            os.write(fd, b"".join(lines))
+            return
+        
+        written = os.writev(fd, lines)
+        total = sum(map(len, lines))
+        if written < total:
+            # Short write: finish the remainder so no line is left half-written
+            os.write(fd, b"".join(lines)[written:])
+
+    def _trade_log_writer():
+        """Append queued trade log lines, batching whatever is pending into one write"""
+        fd = None  # Kept open across batches; O_APPEND keeps every write at the end of the file
+        while True:
+            lines = [_trade_log_queue.get()]
+            while len(lines) < TRADE_LOG_BATCH_SIZE:
+                try:
+                    lines.append(_trade_log_queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            try:
+                if fd is None:
+                    os.makedirs(os.path.dirname(TRADE_LOG_FILE), exist_ok=True)
+                    fd = os.open(TRADE_LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                _write_lines(fd, lines)
+            except Exception as e:
+                logger.error(f"Error writing to trade log: {e}")
+                # Reopen on the next batch in case the file or directory went away
+                if fd is not None:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+                    fd = None
 
     # Scheduler for periodic tasks
     scheduler = BackgroundScheduler()
 
+    @dataclass(frozen=True)
+    class TradingConfig:
+        """Immutable snapshot of the trading settings"""
+        default_quantity: int
+        max_trade_value: float
+
     # Trading configuration - load from file storage
     def load_trading_config():
         """Load trading configuration from storage"""
         settings = storage.get_all_settings()
         
-        # Use memory_optimizer to optimize the dictionary
-        return memory_optimizer_instance.optimize_dict({
-            'DEFAULT_QUANTITY': int(settings.get('DEFAULT_QUANTITY', "1")),
-            'MAX_TRADE_VALUE': float(settings.get('MAX_TRADE_VALUE', "5000"))
-        })
+        return TradingConfig(
+            default_quantity=int(settings.get('DEFAULT_QUANTITY', "1")),
+            max_trade_value=float(settings.get('MAX_TRADE_VALUE', "5000"))
+        )
+
+    # Initialize trading configuration; replaced (never mutated) when settings change,
+    # so an alert that has taken a snapshot keeps consistent values
+    trading_config = load_trading_config()
+
+    # Store received alerts in memory, persisted per day by FileStorage so a restart keeps today's alerts
+    # Indexed by date so /api/alerts doesn't scan every stored alert; each day keeps its latest alerts
+    MAX_ALERTS_PER_DAY = 1000
+    ALERT_RETENTION_DAYS = 7
+    alerts_by_date = defaultdict(lambda: deque(maxlen=MAX_ALERTS_PER_DAY))
+    _alerts_lock = threading.Lock()  # A deque can't be copied while another thread appends to it
+    _alerts_pruned = {"date": None}  # Day the retention window was last applied
+
+    def store_alert(alert_data, received_on):
+        """Store an alert, index it by the date it was received and persist it"""
+        with _alerts_lock:
+            # Drop days past the retention window once per day
+            new_day = _alerts_pruned["date"] != received_on
+            if new_day:
+                _alerts_pruned["date"] = received_on
+                cutoff = received_on - timedelta(days=ALERT_RETENTION_DAYS)
+                for old_date in [d for d in alerts_by_date if d < cutoff]:
+                    del alerts_by_date[old_date]
+            
+            alerts_by_date[received_on].append(alert_data)
+        
+        if new_day:
+            storage.prune_alerts(cutoff)
+        storage.append_alert(alert_data, received_on)
+
+    def get_alerts_for(alert_date):
+        """Get a copy of the alerts received on a date"""
+        with _alerts_lock:
+            return list(alerts_by_date.get(alert_date, ()))
+
+    # Reload today's alerts persisted before a restart; most processes don't live past
+    # midnight, so the retention window is applied to the stored files here as well
+    _today = date.today()
+    alerts_by_date[_today].extend(storage.reload_alerts(_today, ALERT_RETENTION_DAYS))
+    _alerts_pruned["date"] = _today
+    logger.info(f"Loaded {len(alerts_by_date[_today])} stored alerts for today")
+
+    # Fingerprints of alerts processed today, used to drop ChartInk re-deliveries
+    _seen_alerts = {"date": None, "fingerprints": set()}
+
+    def is_duplicate_alert(data):
+        """
+        Check whether an identical alert (same scan, stocks and trigger time) was already processed today
+        
+        Args:
+            data (dict): Raw ChartInk webhook payload
+        
+        Returns:
+            bool: True if the alert was seen before, False otherwise (the alert is then recorded)
+        """
+        triggered_at = data.get('triggered_at')
+        if not triggered_at:
+            # Without a trigger time, identical payloads can be legitimate repeat signals
+            return False
+        
+        stocks = data.get('stocks', [])
+        if isinstance(stocks, str):
+            stocks = stocks.split(',')
+        stocks_key = ','.join(sorted(s.strip() for s in stocks if s.strip()))
+        
+        fingerprint = hashlib.blake2b(
+            f"{data.get('scan_name', '')}|{stocks_key}|{triggered_at}".encode(),
+            digest_size=16
+        ).digest()
+        
+        # Start a fresh set every day; trigger times repeat across days
+        today = date.today()
+        if _seen_alerts["date"] != today:
+            _seen_alerts["date"] = today
+            _seen_alerts["fingerprints"] = set()
+        
+        if fingerprint in _seen_alerts["fingerprints"]:
+            return True
+        
+        _seen_alerts["fingerprints"].add(fingerprint)
+        return False
+
+    # Cache the token read from storage so API requests don't re-read the token file every time
+    AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
 
-    # Initialize trading configuration
-    config = load_trading_config()
-    DEFAULT_QUANTITY = config['DEFAULT_QUANTITY']
-    MAX_TRADE_VALUE = config['MAX_TRADE_VALUE']
+    @dataclass(frozen=True)
+    class AuthState:
+        """Immutable snapshot of the cached token and when it must be re-read"""
+        token_data: Optional[dict]
+        expires_at: float  # time.monotonic() deadline
 
-    # Store received alerts in memory (cleared on restart)
-    received_alerts = []
+    # Readers take the current snapshot without locking; writers build a new
+    # AuthState under the lock and publish it with a single rebind
+    _auth_state = AuthState(token_data=None, expires_at=0.0)
+    _auth_lock = threading.RLock()
+
+    def get_cached_token():
+        """Get token data from storage, re-reading it at most once every AUTH_CACHE_TTL seconds (±10%)"""
+        global _auth_state
+        
+        state = _auth_state
+        if time.monotonic() < state.expires_at:
+            return state.token_data
+        
+        with _auth_lock:
+            # Another thread may have refreshed the cache while we waited
+            state = _auth_state
+            now = time.monotonic()
+            if now < state.expires_at:
+                return state.token_data
+            
+            token_data = storage.get_token()
+            # Only cache valid tokens so a fresh login is picked up immediately;
+            # jitter the TTL so refreshes don't line up across processes
+            expires_at = 0.0
+            if token_data:
+                expires_at = now + AUTH_CACHE_TTL + random.uniform(-0.1, 0.1) * AUTH_CACHE_TTL
+            
+            _auth_state = AuthState(token_data=token_data, expires_at=expires_at)
+            return token_data
+
+    def invalidate_auth_cache():
+        """Force the next request to re-read the token from storage"""
+        global _auth_state
+        
+        with _auth_lock:
+            _auth_state = AuthState(token_data=None, expires_at=0.0)
 
     # Authentication middleware
     def require_auth(f):
@@ -356,20 +592,23 @@ else:
         @wraps(f)
         def decorated_function(*args, **kwargs):
             try:
-                # Get token from storage
-                token_data = storage.get_token()
+                # Get token from storage (cached)
+                token_data = get_cached_token()
                 
                 # Check if token exists
                 if not token_data or not token_data.get('access_token'):
                     return jsonify({"status": "error", "message": "Authentication required"}), 401
                 
-                # Validate token expiry if available
-                if 'expires_at' in token_data:
+                # Validate token expiry if available; FileStorage records a numeric
+                # expires_timestamp, which can be compared without parsing a date string
+                if 'expires_timestamp' in token_data:
+                    if time.time() > token_data['expires_timestamp']:
+                        return jsonify({"status": "error", "message": "Token expired"}), 401
+                elif 'expires_at' in token_data:
                     expires_at = token_data.get('expires_at')
                     try:
                         # Parse timestamp
                         if isinstance(expires_at, str):
-                            from datetime import datetime
                             expires_at = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
                         
                         # Check if token has expired
@@ -396,7 +635,7 @@ else:
     @app.route('/')
     def index():
         """Dashboard page"""
-        return send_from_directory('auth', 'dashboard.html')
+        return serve_auth_page('dashboard.html')
 
     @app.route('/health')
     def health():
@@ -406,17 +645,17 @@ else:
     @app.route('/auth/refresh')
     def auth_refresh():
         """Show the token refresh page"""
-        return send_from_directory('auth', 'refresh.html')
+        return serve_auth_page('refresh.html')
 
     @app.route('/auth/alerts')
     def alerts_page():
         """Show the alerts page"""
-        return send_from_directory('auth', 'alerts.html')
+        return serve_auth_page('alerts.html')
 
     @app.route('/auth/settings')
     def settings_page():
         """Show the settings page"""
-        return send_from_directory('auth', 'settings.html')
+        return serve_auth_page('settings.html')
 
     @app.route('/auth/login')
     def auth_login():
@@ -464,6 +703,9 @@ else:
                 
                 # Synchronize with token_manager
                 token_manager.save_token(user_id, username, token_data['access_token'])
+                
+                # Make sure API requests see the new token straight away
+                invalidate_auth_cache()
             except Exception as e:
                 logger.error(f"Error saving user data: {e}")
             
@@ -477,8 +719,8 @@ else:
     def auth_status():
         """Check if authenticated with Kite"""
         try:
-            # Get token from storage
-            token_data = storage.get_token()
+            # Get token from storage (cached)
+            token_data = get_cached_token()
             
             # Synchronize with token_manager for consistency
             if token_data and token_data.get('access_token'):
@@ -516,14 +758,14 @@ else:
         try:
             # Check if trading is enabled via token manager
             if token_manager.is_trading_enabled():
-                # Get token from token manager
-                access_token = token_manager.get_token()
+                # Token was just validated, so read it directly instead of re-checking via get_token()
+                access_token = token_manager.access_token
                 
                 # Update Kite instance if token has changed
                 if kite.access_token != access_token:
                     kite.set_access_token(access_token)
                 
-                logger.info(f"Kite API authenticated as {token_manager.username}")
+                logger.debug("Kite API authenticated as %s", token_manager.username)
                 return True
             
             # Token is invalid or expired
@@ -533,83 +775,213 @@ else:
             logger.error(f"Kite authentication error: {e}")
             return False
 
-    def place_order(symbol, transaction_type, quantity, order_type="MARKET", price=0):
+    # Margins change only when orders are placed, so back-to-back alerts and dashboard
+    # refreshes share one Kite call; the cache is dropped as soon as orders go out
+    MARGINS_CACHE_TTL = 10  # seconds
+    _margins_cache = (None, 0.0)  # (margins, time.monotonic() expiry)
+
+    def get_cached_margins():
+        """Get account margins from Kite, reusing a result fetched in the last MARGINS_CACHE_TTL seconds"""
+        global _margins_cache
+        
+        margins, expires_at = _margins_cache
+        if margins is not None and time.monotonic() < expires_at:
+            return margins
+        
+        margins = kite.get_margins()
+        _margins_cache = (margins, time.monotonic() + MARGINS_CACHE_TTL)
+        return margins
+
+    def invalidate_margins_cache():
+        """Force the next margins lookup to go to Kite"""
+        global _margins_cache
+        _margins_cache = (None, 0.0)
+
+    # Positions back the dashboard and the P&L endpoint, which are polled. While the market is
+    # open a background thread refreshes them so requests are served from memory; otherwise
+    # a short TTL collapses bursts of polls into one Kite call
+    POSITIONS_CACHE_TTL = 5  # seconds
+    POSITIONS_REFRESH_INTERVAL = max(5, int(os.getenv("POSITIONS_REFRESH_SECONDS", "10")))  # Floor keeps Kite calls bounded
+    _positions_cache = (None, 0.0)  # (positions, time.monotonic() expiry)
+
+    def refresh_positions_cache(ttl=POSITIONS_CACHE_TTL):
+        """Fetch positions from Kite and cache them for ttl seconds"""
+        global _positions_cache
+        
+        positions = kite.get_positions()
+        _positions_cache = (positions, time.monotonic() + ttl)
+        return positions
+
+    def get_cached_positions():
+        """Get positions from Kite, reusing a cached result while it is fresh"""
+        ensure_background_thread("positions-refresher", _positions_refresher)
+        
+        positions, expires_at = _positions_cache
+        if positions is not None and time.monotonic() < expires_at:
+            return positions
+        
+        return refresh_positions_cache()
+
+    def _positions_refresher():
+        """Keep the positions cache warm during market hours"""
+        while True:
+            time.sleep(POSITIONS_REFRESH_INTERVAL)
+            if not (BYPASS_MARKET_HOURS or is_market_open()) or not token_manager.is_trading_enabled():
+                continue
+            
+            try:
+                if authenticate_kite():
+                    # Stays valid until just past the next refresh, so polls never wait on Kite
+                    refresh_positions_cache(POSITIONS_REFRESH_INTERVAL + POSITIONS_CACHE_TTL)
+            except Exception as e:
+                logger.warning(f"Background positions refresh failed: {e}")
+
+    def invalidate_positions_cache():
+        """Force the next positions lookup to go to Kite"""
+        global _positions_cache
+        _positions_cache = (None, 0.0)
+
+    # Shared pool for placing an alert's orders concurrently (threads are reused across alerts).
+    # Every call goes through the rate-limited kite client, whose token bucket reserves capacity
+    # per call, so concurrent workers queue behind each other instead of bursting past Kite's limit
+    order_executor = ThreadPoolExecutor(max_workers=ORDER_WORKERS, thread_name_prefix="order")
+
+    def calculate_quantity(price, remaining_funds, max_trade_value):
+        """
+        Size a position as the number of shares that fit within the per-trade cap
+        
+        Args:
+            price (float): Trigger price of the stock
+            remaining_funds (float): Funds not yet allocated to other orders
+            max_trade_value (float): Maximum value of a single trade
+        
+        Returns:
+            int: Quantity to order (0 if not even one share fits)
+        """
+        return int(min(max_trade_value, remaining_funds) / price)
+
+    def parse_symbol(stock):
+        """
+        Split a ChartInk symbol into its exchange and trading symbol
+        
+        Args:
+            stock (str): Symbol such as "RELIANCE" or "NFO:NIFTY24APRFUT"
+        
+        Returns:
+            tuple: (exchange, tradingsymbol), defaulting to NSE when there is no known prefix
+        """
+        prefix, sep, tradingsymbol = stock.partition(":")
+        if sep and prefix in EXCHANGES:
+            return prefix, tradingsymbol
+        return "NSE", stock
+
+    def _market_order_params(exchange, tradingsymbol, transaction_type, quantity, price=0):
+        """Build the Kite order parameters for a MARKET order"""
+        return {
+            "tradingsymbol": tradingsymbol,
+            "exchange": exchange,
+            "transaction_type": transaction_type,  # BUY or SELL
+            "quantity": quantity,
+            "order_type": "MARKET",
+            "product": "CNC"  # Using CNC (delivery) instead of MIS (intraday)
+        }
+
+    def _limit_order_params(exchange, tradingsymbol, transaction_type, quantity, price=0):
+        """Build the Kite order parameters for a LIMIT order"""
+        order_params = _market_order_params(exchange, tradingsymbol, transaction_type, quantity)
+        order_params["order_type"] = "LIMIT"
+        if price > 0:
+            order_params["price"] = price
+        return order_params
+
+    def _sl_order_params(exchange, tradingsymbol, transaction_type, quantity, price=0):
+        """Build the Kite order parameters for an SL order with a trigger price in the permissible range"""
+        order_params = _market_order_params(exchange, tradingsymbol, transaction_type, quantity)
+        order_params["order_type"] = "SL"
+        if price <= 0:
+            return order_params
+        
+        # Calculate permissible range based on exchange requirements
+        # For NSE equity, typically 3% for most stocks
+        if transaction_type == "SELL":
+            # For stop-loss sell orders, trigger price should be lower
+            trigger_price = round(price * SL_SELL_TRIGGER_FACTOR, 1)  # 3% below limit price
+            # Limit price should be slightly below trigger price to ensure execution
+            limit_price = round(trigger_price * SL_SELL_LIMIT_FACTOR, 1)
+        else:
+            # For stop-loss buy orders, trigger price should be higher
+            trigger_price = round(price * SL_BUY_TRIGGER_FACTOR, 1)  # 3% above limit price
+            # Limit price should be slightly above trigger price
+            limit_price = round(trigger_price * SL_BUY_LIMIT_FACTOR, 1)
+        
+        order_params["trigger_price"] = trigger_price
+        order_params["price"] = limit_price
+        logger.info("SL %s order configured - Trigger price: %s, Limit price: %s", transaction_type, trigger_price, limit_price)
+        return order_params
+
+    # Order parameter builders by order type; each path only does the work its order type needs
+    ORDER_PARAM_BUILDERS = {
+        "MARKET": _market_order_params,
+        "LIMIT": _limit_order_params,
+        "SL": _sl_order_params
+    }
+
+    def place_order(exchange, tradingsymbol, transaction_type, quantity, order_type="MARKET", price=0):
         """Place an order via Kite Connect"""
         try:
-            exchange = "NSE"
-            if "NFO:" in symbol:
-                exchange = "NFO"
-                symbol = symbol.replace("NFO:", "")
-            elif "NSE:" in symbol:
-                symbol = symbol.replace("NSE:", "")
-            
-            # Place the order
-            order_params = {
-                "tradingsymbol": symbol,
-                "exchange": exchange,
-                "transaction_type": transaction_type,  # BUY or SELL
-                "quantity": quantity,
-                "order_type": order_type,  # MARKET, LIMIT, etc.
-                "product": "CNC"  # Using CNC (delivery) instead of MIS (intraday)
-            }
-            
-            # Add price for LIMIT orders
-            if order_type == "LIMIT" and price > 0:
-                order_params["price"] = price
-            
-            # Add trigger price for SL orders with proper range
-            if order_type == "SL" and price > 0:
-                # Calculate permissible range based on exchange requirements
-                # For NSE equity, typically 3% for most stocks
-                if transaction_type == "SELL":
-                    # For stop-loss sell orders, trigger price should be lower
-                    trigger_price = round(price * 0.97, 1)  # 3% below limit price
-                    order_params["trigger_price"] = trigger_price
-                    # Limit price should be slightly below trigger price to ensure execution
-                    order_params["price"] = round(trigger_price * 0.99, 1)
-                    logger.info(f"SL SELL order configured - Trigger price: {trigger_price}, Limit price: {order_params['price']}")
-                else:
-                    # For stop-loss buy orders, trigger price should be higher
-                    trigger_price = round(price * 1.03, 1)  # 3% above limit price
-                    order_params["trigger_price"] = trigger_price
-                    # Limit price should be slightly above trigger price
-                    order_params["price"] = round(trigger_price * 1.01, 1)
-                    logger.info(f"SL BUY order configured - Trigger price: {trigger_price}, Limit price: {order_params['price']}")
+            build_params = ORDER_PARAM_BUILDERS.get(order_type)
+            if build_params:
+                order_params = build_params(exchange, tradingsymbol, transaction_type, quantity, price)
+            else:
+                # Other order types are passed through to Kite without extra parameters
+                order_params = _market_order_params(exchange, tradingsymbol, transaction_type, quantity)
+                order_params["order_type"] = order_type
             
-            logger.info(f"Placing order: {json.dumps(order_params)}")
+            logger.info("Placing order: %s", order_params)
             
             order_id = kite.place_order(
                 variety="regular",
                 params=order_params
             )
             
-            logger.info(f"Order placed successfully. Order ID: {order_id}")
+            logger.info("Order placed successfully. Order ID: %s", order_id)
             return order_id
         except Exception as e:
-            logger.error(f"Order placement failed: {e}")
+            logger.error("Order placement failed: %s", e)
             return None
 
-    def process_chartink_alert(data):
-        """Process the ChartInk alert data and place orders if appropriate"""
-        logger.info(f"Processing ChartInk alert: {json.dumps(data)}")
+    def process_chartink_alert(data, skip_auth=False):
+        """
+        Process the ChartInk alert data and place orders if appropriate
         
-        # Check if authentication is valid
-        if not authenticate_kite():
+        Args:
+            data (dict): ChartInk webhook payload
+            skip_auth (bool): Skip authenticate_kite() when the caller has already done it
+        """
+        logger.info("Processing ChartInk alert: %s", data)
+        
+        # Skip alerts ChartInk has already delivered before making any Kite call
+        if is_duplicate_alert(data):
+            logger.info("Duplicate alert for scanner '%s' at %s, skipping", data.get('scan_name'), data.get('triggered_at'))
+            return True
+        
+        # Check if authentication is valid (place_order still refuses to trade on an expired token)
+        if not skip_auth and not authenticate_kite():
             logger.error("Kite authentication failed, cannot process alert")
             return False
         
         # Get available funds first
         try:
-            margins = kite.get_margins()
+            margins = get_cached_margins()
             available_funds = margins.get('equity', {}).get('available', {}).get('cash', 0)
-            logger.info(f"Available funds: ₹{available_funds}")
+            logger.info("Available funds: ₹%s", available_funds)
             
             if available_funds <= 0:
-                logger.error(f"Insufficient funds available (₹{available_funds}), cannot place orders")
-                telegram.send_message(f"⚠️ <b>Alert Received but Insufficient Funds</b>\nAvailable: ₹{available_funds}")
+                logger.error("Insufficient funds available (₹%s), cannot place orders", available_funds)
+                telegram.enqueue(telegram.send_message, f"⚠️ <b>Alert Received but Insufficient Funds</b>\nAvailable: ₹{available_funds}")
                 return False
         except Exception as e:
-            logger.error(f"Error checking available funds: {e}")
+            logger.error("Error checking available funds: %s", e)
             # Continue with the process but log the error
         
         # Extract alert data
@@ -631,14 +1003,13 @@ else:
             prices.append("N/A")
         
         # Determine the action (BUY/SELL) based on the scan name
-        action = "BUY"  # Default
-        if any(term in scan_name.lower() for term in ["sell", "short", "bearish", "breakdown", "down"]):
-            action = "SELL"
+        action = "SELL" if SELL_PATTERN.search(scan_name) else "BUY"
         
         # We'll no longer send a separate ChartInk alert - combined notification will be sent after order placement
         # Instead, we'll collect successful trades and send a combined notification at the end
         
         # Store alert in memory
+        received_at = datetime.now()
         alert_data = {
             'scan_name': scan_name,
             'scan_url': data.get('scan_url', ''),
@@ -646,83 +1017,121 @@ else:
             'stocks': stocks,
             'prices': prices,
             'triggered_at': data.get('triggered_at', ''),
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            'timestamp': received_at.strftime("%Y-%m-%d %H:%M:%S")
         }
         
         # Add action to the stored alert
         alert_data['action'] = action
-        received_alerts.append(alert_data)
+        store_alert(alert_data, received_at.date())
         
         # Log alert info
-        logger.info(f"Received alert from scanner '{scan_name}' at {alert_data['triggered_at']}")
-        logger.info(f"Stocks: {stocks}")
-        logger.info(f"Prices: {prices}")
+        logger.info("Received alert from scanner '%s' at %s", scan_name, alert_data['triggered_at'])
+        logger.info("Stocks: %s", stocks)
+        logger.info("Prices: %s", prices)
         
         # Validate required data
         if not stocks or not prices or len(stocks) != len(prices):
-            logger.error(f"Invalid alert data: {data}")
+            logger.error("Invalid alert data: %s", data)
             return False
         
         success_count = 0
         error_count = 0
         funds_used = 0
         successful_trades = []  # To collect information about successful trades
+        planned_orders = []  # Orders sized up front so they can be placed concurrently
         
-        # Process each stock in the alert
-        for i, stock in enumerate(stocks):
+        # Parse stocks and prices into (symbol, price) pairs once, dropping malformed rows
+        pairs = []
+        for stock, price in zip(stocks, prices):
             stock = stock.strip()
             if not stock:
                 continue
             
             try:
-                price = float(prices[i].strip())
-                
-                logger.info(f"Processing {stock} with {action} at price {price}")
+                pairs.append((stock, float(price.strip())))
+            except (ValueError, AttributeError) as e:
+                logger.error("Error processing stock %s: invalid price %r (%s)", stock, price, e)
+                error_count += 1
+        
+        # Snapshot the trading settings once for the whole alert
+        cfg = trading_config
+        max_trade_value = cfg.max_trade_value
+        default_quantity = cfg.default_quantity
+        
+        # First pass: size every order sequentially so fund allocation stays consistent
+        for stock, price in pairs:
+            try:
+                logger.info("Processing %s with %s at price %s", stock, action, price)
                 
                 # Check if we have enough funds remaining (considering what we've already allocated)
                 remaining_funds = available_funds - funds_used
                 if remaining_funds < price:
-                    logger.warning(f"Not enough remaining funds (₹{remaining_funds}) to place order for {stock} at ₹{price}")
+                    logger.warning("Not enough remaining funds (₹%s) to place order for %s at ₹%s", remaining_funds, stock, price)
                     continue
 
-                # If price is higher than MAX_TRADE_VALUE, skip this stock
-                if price > MAX_TRADE_VALUE:
-                    logger.warning(f"Stock price (₹{price}) exceeds maximum trade value (₹{MAX_TRADE_VALUE}), skipping {stock}")
+                # If price is higher than the max trade value, skip this stock
+                if price > max_trade_value:
+                    logger.warning("Stock price (₹%s) exceeds maximum trade value (₹%s), skipping %s", price, max_trade_value, stock)
                     continue
                 
                 # Position sizing: Calculate quantity based on max trade value per stock
-                max_value_for_trade = min(MAX_TRADE_VALUE, remaining_funds)
-                quantity = int(max_value_for_trade / price)
+                quantity = calculate_quantity(price, remaining_funds, max_trade_value)
                 
                 # Fallback to default quantity if calculation fails or results in zero
                 if quantity <= 0:
-                    quantity = DEFAULT_QUANTITY
-                    logger.warning(f"Using default quantity ({DEFAULT_QUANTITY}) for {stock}")
+                    quantity = default_quantity
+                    logger.warning("Using default quantity (%s) for %s", default_quantity, stock)
                 
                 # Log the position sizing calculation
-                logger.info(f"Position sizing for {stock}: Max trade value = ₹{MAX_TRADE_VALUE}, " +
-                            f"Price = ₹{price}, Calculated quantity = {quantity}")
+                logger.info("Position sizing for %s: Max trade value = ₹%s, Price = ₹%s, Calculated quantity = %s",
+                            stock, max_trade_value, price, quantity)
                 
-                # Prepend NSE: to stock if not already present
-                stock_symbol = stock
-                if not (stock.startswith("NSE:") or stock.startswith("NFO:")):
-                    stock_symbol = f"NSE:{stock}"
+                # Resolve the exchange once; defaults to NSE when the symbol has no prefix
+                exchange, tradingsymbol = parse_symbol(stock)
                 
-                # Place the order
-                order_id = place_order(stock_symbol, action, quantity)
+                # Reserve the funds for this order; released again if placement fails
+                trade_value = price * quantity
+                funds_used += trade_value
+                planned_orders.append({
+                    "stock": stock,
+                    "exchange": exchange,
+                    "tradingsymbol": tradingsymbol,
+                    "price": price,
+                    "quantity": quantity,
+                    "value": trade_value
+                })
+            except Exception as e:
+                logger.error("Error processing stock %s: %s", stock, e)
+                error_count += 1
+        
+        # Second pass: place all orders concurrently - each one is an independent Kite API call
+        order_ids = list(order_executor.map(
+            lambda order: place_order(order["exchange"], order["tradingsymbol"], action, order["quantity"]),
+            planned_orders
+        ))
+        if planned_orders:
+            invalidate_margins_cache()  # Funds have changed
+            invalidate_positions_cache()
+        placed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # Shared by every trade in this alert
+        
+        for order, order_id in zip(planned_orders, order_ids):
+            stock = order["stock"]
+            price = order["price"]
+            quantity = order["quantity"]
+            trade_value = order["value"]
+            
+            try:
                 if not order_id:
-                    logger.error(f"Failed to place order for {stock}")
+                    logger.error("Failed to place order for %s", stock)
+                    funds_used -= trade_value
                     error_count += 1
                     continue
                 
-                # Track funds used
-                trade_value = price * quantity
-                funds_used += trade_value
-                logger.info(f"Allocated ₹{trade_value:.2f} for {stock}, total allocated: ₹{funds_used:.2f}")
+                logger.info("Allocated ₹%.2f for %s, total allocated: ₹%.2f", trade_value, stock, funds_used)
                 
                 # Log the trade details
                 trade_details = {
-                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "timestamp": placed_at,
                     "stock": stock,
                     "signal": action,
                     "price": price,
@@ -741,22 +1150,15 @@ else:
                     "order_id": order_id
                 })
                 
-                # Append to trade log file (use a path that's writable in Railway)
-                try:
-                    log_dir = os.path.join(os.getcwd(), 'logs')
-                    os.makedirs(log_dir, exist_ok=True)
-                    log_file = os.path.join(log_dir, "trade_log.json")
-                    
-                    with open(log_file, "a") as f:
-                        f.write(json.dumps(trade_details) + "\n")
-                except Exception as e:
-                    logger.error(f"Error writing to trade log: {e}")
+                # Hand the trade to the background trade log writer
+                _trade_log_queue.put_nowait(dumps_line(trade_details))
+                ensure_background_thread("trade-log-writer", _trade_log_writer)
                 
                 success_count += 1
-                logger.info(f"Successfully processed {stock}")
+                logger.info("Successfully processed %s", stock)
                 
             except Exception as e:
-                logger.error(f"Error processing stock {stock}: {e}")
+                logger.error("Error processing stock %s: %s", stock, e)
                 error_count += 1
         
         # Send a combined notification for the ChartInk alert and trades
@@ -771,7 +1173,7 @@ else:
                 # Create the message
                 message = f"{emoji} <b>ChartInk {action} Alert with Orders</b>\n\n"
                 message += f"<b>Scan:</b> {scan_name}\n"
-                message += f"<b>Time:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                message += f"<b>Time:</b> {placed_at}\n\n"
                 
                 message += f"<b>Orders Placed:</b> {success_count} of {len(stocks)}\n"
                 message += f"<b>Total Value:</b> ₹{funds_used:.2f}\n\n"
@@ -782,36 +1184,105 @@ else:
                     message += f"  Order ID: <code>{trade['order_id']}</code>\n"
                 
                 # Send the combined message
-                telegram.send_message(message)
+                telegram.enqueue(telegram.send_message, message)
             elif len(stocks) > 0:
                 # If no trades were successful but there were stocks in the alert
-                telegram.notify_chartink_alert(scan_name, stocks, prices)
+                telegram.enqueue(telegram.notify_chartink_alert, scan_name, stocks, prices)
         except Exception as e:
-            logger.error(f"Error sending combined notification: {e}")
+            logger.error("Error queueing combined notification: %s", e)
         
-        logger.info(f"Alert processing complete. Success: {success_count}, Errors: {error_count}, Total funds allocated: ₹{funds_used:.2f}")
+        logger.info("Alert processing complete. Success: %d, Errors: %d, Total funds allocated: ₹%.2f", success_count, error_count, funds_used)
         return success_count > 0
 
+    # Alerts are processed by a background worker so the webhook can acknowledge
+    # ChartInk immediately; one worker keeps fund allocation consistent across alerts
+    MAX_PENDING_ALERTS = 100
+    _alert_queue = queue.Queue(maxsize=MAX_PENDING_ALERTS)
+
+    def _alert_worker():
+        """Process queued ChartInk alerts one at a time"""
+        while True:
+            data = _alert_queue.get()
+            try:
+                # The webhook authenticated before queueing the alert
+                if not process_chartink_alert(data, skip_auth=True):
+                    logger.warning("Queued alert was processed but no orders were placed")
+            except Exception as e:
+                logger.error(f"Error processing queued alert: {e}")
+            finally:
+                _alert_queue.task_done()
+
+    # Webhook throttling: a token bucket per client absorbs bursts, and exact replays
+    # of a payload within a short window are acknowledged without being queued again
+    WEBHOOK_RATE = 10.0  # requests per second per client
+    WEBHOOK_BURST = 20.0
+    WEBHOOK_REPLAY_WINDOW = 30  # seconds
+    MAX_TRACKED_CLIENTS = 1024
+    _webhook_buckets = OrderedDict()  # client -> TokenBucket, least recently seen first
+    _recent_payloads = {}  # payload digest -> time.monotonic() expiry
+    _webhook_lock = threading.Lock()
+
+    def is_webhook_rate_limited(client):
+        """Check whether a client has exceeded the webhook rate"""
+        with _webhook_lock:
+            bucket = _webhook_buckets.get(client)
+            if bucket is None:
+                if len(_webhook_buckets) >= MAX_TRACKED_CLIENTS:
+                    _webhook_buckets.popitem(last=False)  # Evict the least recently seen client
+                bucket = _webhook_buckets[client] = TokenBucket(WEBHOOK_RATE, WEBHOOK_BURST)
+            else:
+                _webhook_buckets.move_to_end(client)
+        
+        return not bucket.try_consume()
+
+    def is_replayed_payload(digest):
+        """Check whether a payload with this digest was queued within the last WEBHOOK_REPLAY_WINDOW seconds"""
+        expires_at = _recent_payloads.get(digest)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def remember_payload(digest):
+        """Record a queued payload's digest, dropping expired ones"""
+        now = time.monotonic()
+        with _webhook_lock:
+            for key in [k for k, exp in _recent_payloads.items() if exp <= now]:
+                del _recent_payloads[key]
+            _recent_payloads[digest] = now + WEBHOOK_REPLAY_WINDOW
+
     @app.route('/webhook', methods=['POST'])
     def webhook():
         """Handle incoming webhook from ChartInk"""
+        # Cheap checks first, before touching Kite or parsing the payload
+        client = request.remote_addr  # Set from the trusted proxy hop by ProxyFix
+        if is_webhook_rate_limited(client):
+            logger.warning("Webhook rate limit exceeded for %s", client)
+            return jsonify({"status": "error", "message": "Too many requests"}), 429
+        
+        payload_digest = hashlib.blake2b(request.get_data(), digest_size=16).digest()
+        if is_replayed_payload(payload_digest):
+            logger.info("Ignoring repeated webhook payload from %s", client)
+            return jsonify({"status": "accepted", "message": "Duplicate alert ignored"}), 202
+        
         if not authenticate_kite():
             return jsonify({"status": "error", "message": "Kite authentication failed"}), 500
         
         try:
-            data = request.json
-            logger.info(f"Received webhook data: {data}")
+            # Parsed once and not kept on the request; malformed JSON is treated as an empty payload
+            data = request.get_json(silent=True, cache=False)
+            logger.debug("Received webhook data: %s", data)
             
             if not data:
                 return jsonify({"status": "error", "message": "No data received"}), 400
             
-            # Process the alert
-            success = process_chartink_alert(data)
+            # Queue the alert for background processing and acknowledge right away
+            try:
+                _alert_queue.put_nowait(data)
+                ensure_background_thread("alert-worker", _alert_worker)
+                remember_payload(payload_digest)
+            except queue.Full:
+                logger.error(f"Alert queue is full ({MAX_PENDING_ALERTS} pending), rejecting alert")
+                return jsonify({"status": "error", "message": "Too many pending alerts"}), 503
             
-            if success:
-                return jsonify({"status": "success", "message": "Alert processed successfully"}), 200
-            else:
-                return jsonify({"status": "error", "message": "Failed to process alert"}), 500
+            return jsonify({"status": "accepted", "message": "Alert queued for processing"}), 202
         
         except Exception as e:
             logger.error(f"Webhook error: {e}")
@@ -823,7 +1294,7 @@ else:
     def get_positions():
         """Get current positions"""
         try:
-            positions = kite.get_positions()
+            positions = get_cached_positions()
             
             # Check if the response is what we expect
             if not isinstance(positions, dict):
@@ -832,7 +1303,7 @@ else:
             
             # Extract margin information for the dashboard
             try:
-                margins = kite.get_margins()
+                margins = get_cached_margins()
                 equity = margins.get('equity', {})
                 available_margin = equity.get('available', {}).get('cash', 0)
                 used_margin = equity.get('utilised', {}).get('debits', 0)
@@ -908,11 +1379,7 @@ else:
         """Get received alerts"""
         try:
             # Only return alerts from today
-            today = datetime.now().date()
-            today_alerts = [
-                alert for alert in received_alerts 
-                if datetime.fromisoformat(alert.get("timestamp", "")).date() == today
-            ]
+            today_alerts = get_alerts_for(datetime.now().date())
             
             return jsonify({"status": "success", "data": today_alerts})
         except Exception as e:
@@ -939,8 +1406,8 @@ else:
                 settings = default_settings
                 logger.info("Initialized default settings")
             
-            # Get token data for username
-            token_data = storage.get_token()
+            # Get token data for username (cached)
+            token_data = get_cached_token()
             username = token_data.get('username', 'Unknown') if token_data else 'Unknown'
             
             return jsonify({
@@ -958,7 +1425,7 @@ else:
         """Update trading settings"""
         try:
             # Declare globals at the beginning of the function
-            global DEFAULT_QUANTITY, MAX_TRADE_VALUE
+            global trading_config
             
             data = request.json
             
@@ -967,8 +1434,8 @@ else:
                 return jsonify({"status": "error", "message": "No data provided"}), 400
             
             # Extract settings
-            default_quantity = data.get('default_quantity', DEFAULT_QUANTITY)
-            max_trade_value = data.get('max_trade_value', MAX_TRADE_VALUE)
+            default_quantity = data.get('default_quantity', trading_config.default_quantity)
+            max_trade_value = data.get('max_trade_value', trading_config.max_trade_value)
             
             # Validate settings
             try:
@@ -984,9 +1451,8 @@ else:
             }
             storage.update_settings(settings_update)
             
-            # Update global variables
-            DEFAULT_QUANTITY = default_quantity
-            MAX_TRADE_VALUE = max_trade_value
+            # Publish the new configuration in a single rebind
+            trading_config = TradingConfig(default_quantity=default_quantity, max_trade_value=max_trade_value)
             
             return jsonify({"status": "success", "message": "Trading settings updated"})
         except Exception as e:
@@ -1028,18 +1494,41 @@ else:
             logger.error(f"Error updating telegram settings: {e}")
             return jsonify({"status": "error", "message": str(e)}), 500
 
+    # Notifier for the credentials most recently tested from the settings page; only one
+    # set of submitted credentials is kept, and it is replaced when different ones are tested
+    _test_notifier = {"credentials": None, "notifier": None}
+    _test_notifier_lock = threading.Lock()
+
+    def get_test_notifier(token, chat_id):
+        """
+        Get a notifier for testing credentials, reusing an existing instance where possible
+        
+        Args:
+            token (str): Bot token to test (default: the configured one)
+            chat_id (str): Chat ID to test (default: the configured one)
+        
+        Returns:
+            TelegramNotifier: The shared notifier if the credentials match it, otherwise a cached test notifier
+        """
+        credentials = (token or telegram.telegram_token, chat_id or telegram.telegram_chat_id)
+        if credentials == (telegram.telegram_token, telegram.telegram_chat_id):
+            return telegram
+        
+        with _test_notifier_lock:
+            if _test_notifier["credentials"] != credentials:
+                _test_notifier["notifier"] = TelegramNotifier(token=credentials[0], chat_id=credentials[1])
+                _test_notifier["credentials"] = credentials
+            return _test_notifier["notifier"]
+
     @app.route('/api/telegram/test', methods=['POST'])
     @require_auth
     def test_telegram():
         """Test Telegram notification by sending a test message"""
         try:
-            data = request.json
+            data = request.get_json(silent=True) or {}  # Missing or malformed body falls through to the notifier's own checks
             
-            # Create a temporary notifier with the provided credentials
-            temp_notifier = TelegramNotifier(
-                token=data.get('TELEGRAM_BOT_TOKEN'),
-                chat_id=data.get('TELEGRAM_CHAT_ID')
-            )
+            # Get a notifier for the provided credentials (reused across repeated tests)
+            temp_notifier = get_test_notifier(data.get('TELEGRAM_BOT_TOKEN'), data.get('TELEGRAM_CHAT_ID'))
             
             # Send a test message
             result = temp_notifier.send_test_message()
@@ -1072,8 +1561,6 @@ else:
             }
         
         # If trades are from Kite positions API, they already have P&L information
-        total_investment = 0
-        total_current_value = 0
         winning_trades = 0
         losing_trades = 0
         trades_detail = []
@@ -1085,24 +1572,22 @@ else:
                 price = float(trade.get('price', 0))
                 quantity = int(trade.get('quantity', 0))
                 investment = price * quantity
+                has_last_price = 'last_price' in trade
+                last_price = float(trade['last_price']) if has_last_price else price
                 
                 # If direct PnL is available from Kite API, use it
                 if 'pnl' in trade:
-                    pnl = float(trade.get('pnl', 0))
+                    pnl = float(trade['pnl'])
                     # For sell positions, the PnL logic is reversed in display
                     if action == 'SELL':
                         pnl = -pnl
+                elif action == 'BUY':
+                    # Otherwise calculate P&L from the last traded price
+                    pnl = (last_price - price) * quantity
+                elif action == 'SELL':
+                    pnl = (price - last_price) * quantity
                 else:
-                    # Use calculated P&L from NSE API if no direct PnL
-                    current_price = float(trade.get('last_price', price))
-                    current_value = current_price * quantity
-                    
-                    if action == 'BUY':
-                        pnl = current_value - investment
-                    elif action == 'SELL':
-                        pnl = investment - current_value
-                    else:
-                        pnl = 0
+                    pnl = 0
                 
                 # If we have unrealized and realized P&L from Kite
                 unrealized = float(trade.get('unrealized', 0))
@@ -1120,13 +1605,9 @@ else:
                 elif pnl < 0:
                     losing_trades += 1
                 
-                # Update totals
-                total_investment += investment
-                total_current_value += current_value
-                
                 # Get current price - either from position data or calculate it
-                if 'last_price' in trade:
-                    current_price = float(trade.get('last_price', 0))
+                if has_last_price:
+                    current_price = last_price
                 else:
                     current_price = price + (pnl / quantity) if quantity > 0 else price
                 
@@ -1145,10 +1626,11 @@ else:
                     'realized': realized
                 })
             except Exception as e:
-                logger.error(f"Error calculating P&L for trade {trade}: {e}")
+                logger.error("Error calculating P&L for trade %s: %s", trade, e)
         
-        # Calculate total P&L
-        total_pnl = total_current_value - total_investment
+        # Calculate total P&L in one pass each (fsum avoids drift from adding many floats)
+        total_investment = math.fsum(detail['investment'] for detail in trades_detail)
+        total_pnl = math.fsum(detail['pnl'] for detail in trades_detail)
         total_pnl_percent = (total_pnl / total_investment) * 100 if total_investment > 0 else 0
         
         return {
@@ -1175,60 +1657,68 @@ else:
         trades = []
         
         try:
-            # Fetch positions from Kite API
-            positions = kite.get_positions()
+            # Fetch positions from Kite API (briefly cached)
+            positions = get_cached_positions()
             
             if not positions:
                 logger.warning("No positions data available from Kite API")
                 return []
             
-            # Process both day (MIS) and net (CNC) positions
+            # Every position in this snapshot shares one timestamp
+            now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            
+            # Same-day trades appear in both the day and net lists; keep one copy per
+            # (tradingsymbol, exchange, product) - the day copy for MIS, the net copy otherwise
+            unique_positions = {}
             for position_type in ['day', 'net']:
-                if position_type not in positions:
-                    continue
-                    
-                for position in positions[position_type]:
-                    # Extract relevant information from position
-                    symbol = position.get('tradingsymbol', '')
-                    exchange = position.get('exchange', '')
-                    
-                    # Format symbol with exchange prefix if not already there
-                    if not symbol.startswith("NSE:") and not symbol.startswith("NFO:"):
-                        if exchange:
-                            symbol = f"{exchange}:{symbol}"
-                    
-                    # Determine if this is a buy or sell position based on quantity
-                    quantity = position.get('quantity', 0)
-                    action = "BUY" if quantity > 0 else "SELL"
-                    
-                    # If quantity is negative (short position), make it positive for display
-                    quantity = abs(quantity)
-                    
-                    # Get price details
-                    price = position.get('average_price', 0)
-                    last_price = position.get('last_price', 0)
-                    
-                    # Calculate trade value
-                    value = price * quantity
-                    
-                    # Create trade object
-                    trade = {
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "stock": symbol,
-                        "signal": action,
-                        "price": price,
-                        "quantity": quantity,
-                        "value": value,
-                        "scanner": "Kite Positions",  # Default scanner name
-                        "order_id": "",               # Not available from positions API
-                        "pnl": position.get('pnl', 0),
-                        "unrealized": position.get('unrealised', 0),
-                        "realized": position.get('realised', 0),
-                        "product": "MIS" if position_type == 'day' else "CNC",  # Add product type
-                        "last_price": last_price
-                    }
-                    
-                    trades.append(trade)
+                for position in positions.get(position_type, []):
+                    key = (position.get('tradingsymbol'), position.get('exchange'), position.get('product'))
+                    if key in unique_positions and key[2] == 'MIS':
+                        continue
+                    unique_positions[key] = (position_type, position)
+            
+            # Process both day (MIS) and net (CNC) positions
+            for position_type, position in unique_positions.values():
+                # Extract relevant information from position
+                symbol = position.get('tradingsymbol', '')
+                exchange = position.get('exchange', '')
+                
+                # Format symbol with exchange prefix if not already there
+                if exchange and not symbol.startswith(EXCHANGE_PREFIXES):
+                    symbol = f"{exchange}:{symbol}"
+                
+                # Determine if this is a buy or sell position based on quantity
+                quantity = position.get('quantity', 0)
+                action = "BUY" if quantity > 0 else "SELL"
+                
+                # If quantity is negative (short position), make it positive for display
+                quantity = abs(quantity)
+                
+                # Get price details
+                price = position.get('average_price', 0)
+                last_price = position.get('last_price', 0)
+                
+                # Calculate trade value
+                value = price * quantity
+                
+                # Create trade object
+                trade = {
+                    "timestamp": now_str,
+                    "stock": symbol,
+                    "signal": action,
+                    "price": price,
+                    "quantity": quantity,
+                    "value": value,
+                    "scanner": "Kite Positions",  # Default scanner name
+                    "order_id": "",               # Not available from positions API
+                    "pnl": position.get('pnl', 0),
+                    "unrealized": position.get('unrealised', 0),
+                    "realized": position.get('realised', 0),
+                    "product": "MIS" if position_type == 'day' else "CNC",  # Add product type
+                    "last_price": last_price
+                }
+                
+                trades.append(trade)
             
             logger.info(f"Found {len(trades)} positions from Kite API")
             return trades
@@ -1333,29 +1823,21 @@ if __name__ == "__main__":
             import gunicorn.app.base
             
             # Define a minimal Gunicorn application
-            class StandaloneApplication(gunicorn.app.base.BaseApplication):
-                def __init__(self, app, options=None):
-                    self.options = options or {}
+            class StandaloneApplication(gunicorn.app.base.Application):
+                def __init__(self, app, config_file):
+                    self.config_file = config_file
                     self.application = app
                     super().__init__()
                 
                 def load_config(self):
-                    for key, value in self.options.items():
-                        self.cfg.set(key.lower(), value)
+                    # Same settings file as railway_start.py, so both launch paths behave alike
+                    self.load_config_from_file(self.config_file)
                 
                 def load(self):
                     return self.application
             
-            options = {
-                "bind": "0.0.0.0:5000",
-                "workers": 1,  # Single worker to save memory
-                "timeout": 120,
-                "accesslog": "-",  # Log to stdout
-                "errorlog": "-",   # Log to stderr
-                "preload_app": True,
-                "worker_class": "sync"
-            }
-            StandaloneApplication(app, options).run()
+            config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+            StandaloneApplication(app, config_file).run()
         except ImportError:
             logger.warning("Gunicorn not available, falling back to Flask's built-in server")
             app.run(host='0.0.0.0', port=5000)
@@ -7,13 +7,22 @@ Uses JSON files to persist data with backup locations for Railway's ephemeral fi
 """
 import os
 import json
+import stat
 import time
+import tempfile
 from datetime import datetime, timedelta
 from logger import get_logger  # Import our centralized logger
 
 # Get logger for this module
 logger = get_logger(__name__)
 
+# Seconds settings are served from memory before settings.json is read again
+SETTINGS_CACHE_TTL = 60
+
+# Process umask, read once at import (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 class FileStorage:
     """File-based storage implementation using JSON files with backup locations"""
     
@@ -32,6 +41,10 @@ class FileStorage:
         # Main storage locations
         self.token_file = os.path.join(data_dir, "token.json")
         self.settings_file = os.path.join(data_dir, "settings.json")
+        self.alerts_dir = os.path.join(data_dir, "alerts")  # One JSON-lines file per day
+        
+        # In-memory copy of the settings as (settings, time.monotonic() expiry), refreshed on write
+        self._settings_cache = (None, 0.0)
         
         # Backup locations in case Railway's ephemeral filesystem loses the data directory
         self.tmp_dir = "/tmp" if os.path.exists("/tmp") else os.environ.get("TEMP", "tmp")
@@ -48,6 +61,36 @@ class FileStorage:
         # Create default settings if they don't exist
         self._ensure_default_settings()
     
+    def _write_json(self, path, data):
+        """
+        Atomically write data as JSON to path
+        
+        The data is written to a temporary file in the same directory and then
+        moved into place, so readers never see a partially written file.
+        
+        Args:
+            path (str): Destination file path
+            data: JSON-serializable data
+        """
+        # mkstemp creates the file as 0600; keep the mode a plain open() would have given it
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+            os.chmod(tmp_path, mode)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+    
     def _ensure_default_settings(self):
         """Ensure default settings exist"""
         if not self.get_all_settings():
@@ -173,14 +216,8 @@ class FileStorage:
             key (str): Setting key
             value (str): Setting value
         """
-        # Load existing settings
-        settings = self.get_all_settings()
-        
-        # Update with new value
-        settings[key] = value
-        
-        # Write back to files
-        self.update_settings(settings)
+        # update_settings merges with the stored settings, so only pass the changed key
+        self.update_settings({key: value})
         
         logger.info(f"Updated setting: {key}")
     
@@ -205,6 +242,11 @@ class FileStorage:
         Returns:
             dict: All settings
         """
+        # Serve from memory while the cached copy is fresh
+        cached, expires_at = self._settings_cache
+        if cached is not None and time.monotonic() < expires_at:
+            return dict(cached)
+        
         # Try primary location first
         settings = None
         if os.path.exists(self.settings_file):
@@ -235,6 +277,8 @@ class FileStorage:
         if settings is None:
             logger.info("No settings file found, creating defaults")
             settings = {}
+        else:
+            self._settings_cache = (dict(settings), time.monotonic() + SETTINGS_CACHE_TTL)
         
         return settings
     
@@ -261,8 +305,7 @@ class FileStorage:
         # Write to primary location
         primary_success = False
         try:
-            with open(self.settings_file, "w") as f:
-                json.dump(current_settings, f, indent=2)
+            self._write_json(self.settings_file, current_settings)
             primary_success = True
         except Exception as e:
             logger.error(f"Error writing settings to primary location: {e}")
@@ -270,17 +313,98 @@ class FileStorage:
         # Always try to write backup
         backup_success = False
         try:
-            with open(self.backup_settings_file, "w") as f:
-                json.dump(current_settings, f, indent=2)
+            self._write_json(self.backup_settings_file, current_settings)
             backup_success = True
         except Exception as e:
             logger.error(f"Error writing settings to backup location: {e}")
         
         if primary_success or backup_success:
+            # Write-through so the next read sees the new values without touching disk
+            self._settings_cache = (dict(current_settings), time.monotonic() + SETTINGS_CACHE_TTL)
             logger.info(f"Updated {len(settings_dict)} settings")
         else:
             logger.critical("Failed to save settings to any location!")
     
+    def _alerts_file(self, alert_date):
+        """Path of the alerts file for a date"""
+        return os.path.join(self.alerts_dir, f"{alert_date.isoformat()}.jsonl")
+    
+    def append_alert(self, alert_data, alert_date):
+        """
+        Append an alert to the alerts file for its date
+        
+        Args:
+            alert_data (dict): Alert to store
+            alert_date (date): Date the alert was received
+        """
+        try:
+            os.makedirs(self.alerts_dir, exist_ok=True)
+            with open(self._alerts_file(alert_date), "a") as f:
+                f.write(json.dumps(alert_data) + "\n")
+        except Exception as e:
+            logger.error(f"Error writing alert to storage: {e}")
+    
+    def get_alerts(self, alert_date):
+        """
+        Get all alerts stored for a date
+        
+        Args:
+            alert_date (date): Date to load alerts for
+        
+        Returns:
+            list: Alerts in the order they were received
+        """
+        alerts_file = self._alerts_file(alert_date)
+        if not os.path.exists(alerts_file):
+            return []
+        
+        alerts = []
+        try:
+            with open(alerts_file, "r") as f:
+                for line in f:
+                    try:
+                        alerts.append(json.loads(line))
+                    except ValueError:
+                        # Skip a partially written last line
+                        continue
+        except Exception as e:
+            logger.error(f"Error reading alerts from storage: {e}")
+        
+        return alerts
+    
+    def prune_alerts(self, before_date):
+        """
+        Delete alert files for dates before before_date
+        
+        Args:
+            before_date (date): Oldest date to keep
+        """
+        if not os.path.isdir(self.alerts_dir):
+            return
+        
+        cutoff = f"{before_date.isoformat()}.jsonl"
+        for name in os.listdir(self.alerts_dir):
+            # ISO dates sort chronologically, so file names can be compared directly
+            if name.endswith(".jsonl") and name < cutoff:
+                try:
+                    os.remove(os.path.join(self.alerts_dir, name))
+                except Exception as e:
+                    logger.error(f"Error removing old alerts file {name}: {e}")
+    
+    def reload_alerts(self, today, retention_days):
+        """
+        Reload today's alerts after a restart, pruning files past the retention window first
+        
+        Args:
+            today (date): Current date
+            retention_days (int): Number of days of alert files to keep
+        
+        Returns:
+            list: Today's stored alerts in the order they were received
+        """
+        self.prune_alerts(today - timedelta(days=retention_days))
+        return self.get_alerts(today)
+    
     def clear(self):
         """Clear all stored data (for testing)"""
         if os.path.exists(self.token_file):
@@ -288,6 +412,7 @@ class FileStorage:
         
         if os.path.exists(self.settings_file):
             os.remove(self.settings_file)
+        self._settings_cache = (None, 0.0)
             
         if os.path.exists(self.backup_token_file):
             os.remove(self.backup_token_file)
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+"""
+Gunicorn Configuration
+
+Production server settings for the full trading application. A single worker
+keeps the in-memory state (alerts, queues, caches) shared, while gthread lets
+concurrent webhook and dashboard requests overlap their Kite API calls.
+
+Usage: gunicorn -c gunicorn.conf.py chartink_webhook:app
+"""
+import os
+
+bind = "0.0.0.0:5000"
+workers = 1  # Single worker to save memory and keep in-memory state consistent
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))  # Handle concurrent requests in the worker
+timeout = 120
+accesslog = "-"  # Log to stdout
+errorlog = "-"   # Log to stderr
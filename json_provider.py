@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""
+JSON Provider Module
+
+Flask JSON provider backed by orjson, which parses webhook payloads and
+serializes API responses considerably faster than the standard library.
+Falls back to Flask's default (stdlib json) behaviour if orjson is not installed.
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+from logger import get_logger  # Import our centralized logger
+
+# Get logger for this module
+logger = get_logger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    logger.warning("orjson not available, falling back to standard json module")
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that routes request.json and jsonify through orjson.
+    """
+    
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to a JSON string"""
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        """Deserialize a JSON string or bytes"""
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        
+        return orjson.loads(s)
+
+def dumps_line(obj):
+    """
+    Serialize obj as a single newline-terminated JSON line (for append-only logs).
+    
+    Args:
+        obj: JSON-serializable object
+    
+    Returns:
+        bytes: UTF-8 JSON ending with a newline, ready to write to a file opened in binary mode
+    """
+    if orjson is None:
+        return (json.dumps(obj) + "\n").encode()
+    
+    return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
@@ -1,6 +1,8 @@
 import os
 import hashlib
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 from datetime import datetime
 from urllib.parse import urlencode
@@ -12,6 +14,30 @@ from token_manager import token_manager
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Connection pool size for the shared HTTP session (one connection per concurrent order worker)
+HTTP_POOL_SIZE = int(os.getenv("KITE_HTTP_POOL_SIZE", "32"))
+
+def create_session():
+    """
+    Create a pooled HTTP session for Kite API calls
+    
+    Reusing one session keeps TCP/TLS connections to api.kite.trade alive
+    between calls. Only idempotent GET requests are retried on 502/503/504;
+    order placement and cancellation are never retried automatically.
+    """
+    retry = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
 class KiteConnect:
     """
     A class to connect with Zerodha Kite API, handle authentication,
@@ -35,6 +61,9 @@ class KiteConnect:
             "X-Kite-Version": "3"
         }
         
+        # Shared HTTP session so API calls reuse pooled connections
+        self.session = create_session()
+        
         # Get access token from token manager
         self.access_token = token_manager.get_token()
         if self.access_token:
@@ -42,6 +71,9 @@ class KiteConnect:
     
     def set_access_token(self, access_token):
         """Set the access token for API requests"""
+        if access_token == self.access_token and "Authorization" in self.headers:
+            return
+        
         self.access_token = access_token
         self.headers["Authorization"] = f"token {self.api_key}:{self.access_token}"
     
@@ -103,7 +135,7 @@ class KiteConnect:
         }
         
         # Make the API call
-        response = requests.post(
+        response = self.session.post(
             f"{self.api_url}/session/token",
             headers=self.headers,
             data=data
@@ -134,7 +166,7 @@ class KiteConnect:
     
     def get_profile(self):
         """Get user profile information"""
-        response = requests.get(
+        response = self.session.get(
             f"{self.api_url}/user/profile",
             headers=self.headers
         )
@@ -150,7 +182,7 @@ class KiteConnect:
         if segment:
             endpoint = f"{endpoint}/{segment}"
         
-        response = requests.get(
+        response = self.session.get(
             endpoint,
             headers=self.headers
         )
@@ -162,7 +194,7 @@ class KiteConnect:
     
     def get_orders(self):
         """Get user's order history"""
-        response = requests.get(
+        response = self.session.get(
             f"{self.api_url}/orders",
             headers=self.headers
         )
@@ -174,7 +206,7 @@ class KiteConnect:
     
     def get_positions(self):
         """Get user's current positions"""
-        response = requests.get(
+        response = self.session.get(
             f"{self.api_url}/portfolio/positions",
             headers=self.headers
         )
@@ -197,7 +229,7 @@ class KiteConnect:
         if isinstance(instruments, list):
             instruments = ",".join(instruments)
             
-        response = requests.get(
+        response = self.session.get(
             f"{self.api_url}/quote",
             params={"i": instruments},
             headers=self.headers
@@ -234,7 +266,7 @@ class KiteConnect:
         if not token_manager.is_trading_enabled():
             raise Exception("Trading is currently disabled - Token is expired or invalid")
             
-        response = requests.post(
+        response = self.session.post(
             f"{self.api_url}/orders/{variety}",
             headers=self.headers,
             data=params
@@ -255,7 +287,7 @@ class KiteConnect:
         Returns:
         list: Order history
         """
-        response = requests.get(
+        response = self.session.get(
             f"{self.api_url}/orders/{order_id}",
             headers=self.headers
         )
@@ -280,7 +312,7 @@ class KiteConnect:
         if not token_manager.is_trading_enabled():
             raise Exception("Trading is currently disabled - Token is expired or invalid")
             
-        response = requests.delete(
+        response = self.session.delete(
             f"{self.api_url}/orders/{variety}/{order_id}",
             headers=self.headers
         )
@@ -292,7 +324,7 @@ class KiteConnect:
     
     def logout(self):
         """Logout and invalidate the access token"""
-        response = requests.delete(
+        response = self.session.delete(
             f"{self.api_url}/session/token",
             params={"api_key": self.api_key, "access_token": self.access_token},
             headers=self.headers
@@ -38,35 +38,58 @@ class TokenBucket:
         self.rate = rate
         self.capacity = capacity
         self.tokens = capacity
-        self.last_refill = time.time()
+        self.last_refill = time.monotonic()
         self.lock = threading.RLock()
     
     def consume(self, count=1.0):
         """
-        Consume tokens from the bucket.
+        Reserve tokens from the bucket.
+        
+        The tokens are always debited, even when the bucket doesn't hold enough yet: the
+        balance goes negative and the caller waits until the refill has paid that debt off.
+        Concurrent callers therefore queue up one behind the other instead of all waiting
+        the same interval and then firing together.
+        
+        Args:
+            count (float): Number of tokens to consume
+            
+        Returns:
+            float: Wait time in seconds before the caller may proceed
+        """
+        with self.lock:
+            # Refill the bucket
+            now = time.monotonic()
+            time_passed = now - self.last_refill
+            self.tokens = min(self.capacity, self.tokens + time_passed * self.rate)
+            self.last_refill = now
+            
+            # Reserve the tokens; a negative balance is time other callers have already claimed
+            self.tokens -= count
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+    
+    def try_consume(self, count=1.0):
+        """
+        Consume tokens only if they are available right now (for callers that reject instead of waiting).
         
         Args:
             count (float): Number of tokens to consume
             
         Returns:
-            float: Wait time in seconds before tokens are available
+            bool: True if the tokens were consumed, False if the bucket is short
         """
         with self.lock:
             # Refill the bucket
-            now = time.time()
+            now = time.monotonic()
             time_passed = now - self.last_refill
             self.tokens = min(self.capacity, self.tokens + time_passed * self.rate)
             self.last_refill = now
             
-            # Check if we have enough tokens
             if count <= self.tokens:
-                # We have enough tokens, consume them
                 self.tokens -= count
-                return 0.0
-            else:
-                # Not enough tokens, calculate wait time
-                wait_time = (count - self.tokens) / self.rate
-                return wait_time
+                return True
+            return False
 
 class RateLimitedKiteConnect:
     """
@@ -86,6 +109,9 @@ class RateLimitedKiteConnect:
         'trades': 2.0,         # Getting trade history is higher cost
     }
     
+    # Methods that only touch local client state (no API request), so they bypass the bucket
+    LOCAL_METHODS = frozenset({'set_access_token', 'get_login_url'})
+    
     def __init__(self, kite_instance, rate=3.0, capacity=10.0):
         """
         Initialize the rate limiter with a KiteConnect instance.
@@ -108,8 +134,8 @@ class RateLimitedKiteConnect:
         """
         attr = getattr(self.kite, name)
         
-        if not callable(attr):
-            # For non-callable attributes, return them directly
+        if not callable(attr) or name in self.LOCAL_METHODS:
+            # For non-callable attributes and local-only methods, return them directly
             return attr
         
         @wraps(attr)
@@ -120,7 +146,7 @@ class RateLimitedKiteConnect:
             # Try to consume tokens (this will wait if necessary)
             wait_time = self.bucket.consume(cost)
             if wait_time > 0:
-                logger.debug(f"Rate limiting: Waiting {wait_time:.2f}s for {name} (cost: {cost})")
+                logger.debug("Rate limiting: Waiting %.2fs for %s (cost: %s)", wait_time, name, cost)
                 time.sleep(wait_time)
             
             # Call the underlying method
@@ -128,7 +154,7 @@ class RateLimitedKiteConnect:
             try:
                 result = attr(*args, **kwargs)
                 duration = time.time() - start_time
-                logger.debug(f"API call to {name} completed in {duration:.3f}s")
+                logger.debug("API call to %s completed in %.3fs", name, duration)
                 return result
             except Exception as e:
                 if "rate limit" in str(e).lower():
@@ -8,6 +8,7 @@ It maintains a list of holidays for the current year and provides utilities to d
 import logging
 import datetime
 from datetime import datetime as dt, timedelta
+from functools import lru_cache
 import pytz
 
 # Configure logging
@@ -25,6 +26,9 @@ MARKET_PRE_OPEN_TIME = datetime.time(9, 0)  # 9:00 AM
 # Define regular weekly off days (0 = Monday, 6 = Sunday)
 WEEKLY_OFFS = [5, 6]  # Saturday and Sunday
 
+# Market dates are evaluated in IST
+IST = pytz.timezone('Asia/Kolkata')
+
 # Define 2025 NSE holidays (this should be updated annually)
 # Format: 'YYYY-MM-DD': 'Holiday Name'
 NSE_HOLIDAYS_2025 = {
@@ -54,14 +58,11 @@ def is_market_holiday(date):
     Returns:
         bool: True if the date is a holiday, False otherwise
     """
-    # Use IST timezone for consistency
-    ist = pytz.timezone('Asia/Kolkata')
-    
     # If we got a datetime with timezone, use date() to get just the date
     if isinstance(date, datetime.datetime):
-        # Convert to IST if it has a timezone
+        # Convert to IST if it has a timezone (for consistency)
         if date.tzinfo is not None:
-            date = date.astimezone(ist).date()
+            date = date.astimezone(IST).date()
         else:
             # If no timezone, assume it's already in IST
             date = date.date()
@@ -75,13 +76,16 @@ def is_market_holiday(date):
             logger.error(f"Failed to convert date: {e}")
             return False
     
+    return _is_holiday_date(date)
+
+@lru_cache(maxsize=64)
+def _is_holiday_date(date):
+    """Check a datetime.date against the weekly offs and holiday list (memoized, as the answer never changes)"""
     # Check if it's a weekend
     if date.weekday() in WEEKLY_OFFS:
         return True
     
     # Check if it's in the holiday list
-    # First check if the date is in the current year's format
-    curr_year = datetime.datetime.now(ist).year
     date_str = date.strftime('%Y-%m-%d')
     
     # Direct lookup in holiday list
@@ -157,8 +157,10 @@ def restart_application(use_full_mode):
                 app_process = subprocess.Popen([sys.executable, "chartink_webhook.py"])
                 logger.info("Using Flask development server on Windows instead of gunicorn")
             else:
-                # Full mode with gunicorn for production server (Linux/Mac)
-                app_process = subprocess.Popen(["gunicorn", "--bind", "0.0.0.0:5000", "chartink_webhook:app"])
+                # Full mode with gunicorn for production server (Linux/Mac), configured in gunicorn.conf.py
+                app_process = subprocess.Popen([
+                    "gunicorn", "-c", "gunicorn.conf.py", "chartink_webhook:app"
+                ])
         else:
             # Minimal mode can use regular python to save resources
             app_process = subprocess.Popen([sys.executable, "chartink_webhook.py"])
@@ -172,8 +174,7 @@ def restart_application(use_full_mode):
         if use_full_mode != old_mode:
             # Send notification about mode change
             try:
-                from telegram_notifier import TelegramNotifier
-                telegram = TelegramNotifier()
+                from telegram_notifier import telegram_notifier as telegram
                 now = datetime.now(IST)
                 
                 if use_full_mode:
@@ -315,8 +316,7 @@ def wait_for_market_open():
         
         # Send notification that market is now open
         try:
-            from telegram_notifier import TelegramNotifier
-            telegram = TelegramNotifier()
+            from telegram_notifier import telegram_notifier as telegram
             now = datetime.now(IST)
             
             message = f"The trading bot has started in full mode as the market is now open.\n" \
@@ -380,8 +380,7 @@ def main():
         
         # Prewarm Telegram for notifications
         try:
-            from telegram_notifier import TelegramNotifier
-            TelegramNotifier()
+            import telegram_notifier  # Builds the shared notifier
             logger.info("Prewarmed Telegram notifier")
         except Exception as e:
             logger.error(f"Failed to prewarm Telegram notifier: {e}")
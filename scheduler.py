@@ -4,6 +4,7 @@ import requests
 import threading
 import pytz
 from datetime import datetime, timedelta
+from functools import lru_cache
 from nse_holidays import is_market_holiday, get_next_trading_day
 from token_manager import token_manager
 from logger import get_logger  # Import our centralized logger
@@ -11,9 +12,18 @@ from logger import get_logger  # Import our centralized logger
 # Get logger for this module
 logger = get_logger(__name__)
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Not available on Windows; every process runs its own scheduler there
+
 # Set IST timezone
 IST = pytz.timezone('Asia/Kolkata')
 
+# Only one process on the host runs the scheduler; the others find this file locked
+SCHEDULER_LOCK_FILE = os.getenv("SCHEDULER_LOCK_FILE", "/tmp/kite_scheduler.lock")
+_scheduler_lock = None  # Open lock file, held for the life of the leader process
+
 def is_market_open():
     """
     Check if the market is currently open.
@@ -54,21 +64,33 @@ def calculate_next_market_open():
     """Calculate the next time the market will open"""
     now = datetime.now(IST)
     
-    # Get the next trading day
-    next_trading_day = get_next_trading_day(now.date())
+    # The answer only changes at 9:00 AM and at midnight, so it is cached per (date, before 9 AM)
+    return _next_market_open(now.date(), now.hour < 9)
+
+@lru_cache(maxsize=32)
+def _next_market_open(today, before_open):
+    """
+    Calculate the next market open for a given IST date.
+    
+    Args:
+        today (datetime.date): Current date in IST
+        before_open (bool): Whether the current time is before 9:00 AM IST
     
+    Returns:
+        datetime: Next market open (9:00 AM IST), or None if it can't be determined
+    """
     # If today is a trading day and it's before market open
-    if not is_market_holiday(now) and now.weekday() < 5 and now.hour < 9:
+    if before_open and not is_market_holiday(today) and today.weekday() < 5:
         # Market opens today at 9:00 AM
-        return now.replace(hour=9, minute=0, second=0, microsecond=0)
+        return IST.localize(datetime.combine(today, datetime.min.time()).replace(hour=9))
+    
+    # Get the next trading day
+    next_trading_day = get_next_trading_day(today)
     
     # If we have a valid next trading day
     if next_trading_day:
         # Market opens at 9:00 AM on the next trading day
-        next_open = datetime.combine(next_trading_day, 
-                                   datetime.min.time()).replace(
-                                      hour=9, minute=0, second=0, microsecond=0, tzinfo=IST)
-        return next_open
+        return IST.localize(datetime.combine(next_trading_day, datetime.min.time()).replace(hour=9))
     
     # Fallback - return None if we can't determine
     logger.warning("Could not determine next market open time")
@@ -108,8 +130,43 @@ def auth_checker_thread():
         # Check every 15 minutes
         time.sleep(15 * 60)
 
+def acquire_scheduler_lock():
+    """
+    Try to become the process that runs the scheduler.
+    
+    Returns:
+        bool: True if this process holds the lock (or locking isn't possible here)
+    """
+    global _scheduler_lock
+    
+    if fcntl is None:
+        return True
+    
+    if _scheduler_lock is not None:
+        return False  # This process has already started the scheduler
+    
+    try:
+        lock_file = open(SCHEDULER_LOCK_FILE, "w")
+    except OSError as e:
+        # Can't lock (e.g. read-only filesystem); run the scheduler unlocked, as without fcntl
+        logger.warning(f"Could not open scheduler lock file {SCHEDULER_LOCK_FILE}: {e} - starting scheduler without a lock")
+        return True
+    
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    
+    _scheduler_lock = lock_file
+    return True
+
 def start_scheduler():
     """Start scheduler background process"""
+    if not acquire_scheduler_lock():
+        logger.info("Scheduler already running in another process, not starting it here")
+        return
+    
     # Start authentication checker thread
     t = threading.Thread(target=auth_checker_thread, daemon=True)
     t.start()
@@ -1,50 +1,97 @@
 import os
 import json
+import time
+import queue
+import threading
 import requests
 from datetime import datetime, date
 from dotenv import load_dotenv
 from telegram import Bot
 from logger import get_logger  # Import our centralized logger
 
+# Telegram allows about 30 messages per second per bot; stay below that when draining the queue
+MAX_MESSAGES_PER_SECOND = 25
+
 class TelegramNotifier:
     """
     Notification service using Telegram bot API
     """
-    def __init__(self):
-        """Initialize Telegram bot connection"""
+    def __init__(self, token=None, chat_id=None):
+        """
+        Initialize Telegram bot connection
+        
+        Args:
+            token (str): Bot token (default: TELEGRAM_BOT_TOKEN environment variable)
+            chat_id (str): Chat ID (default: TELEGRAM_CHAT_ID environment variable)
+        """
         # Get logger for this module
         self.logger = get_logger(__name__)
         
-        # Get credentials from environment variables
-        self.telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
-        self.telegram_chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        # Background delivery queue, drained by a worker thread started on first use
+        self._queue = queue.SimpleQueue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        
+        # Guards the credentials, bot and enabled flag, which are replaced together
+        self._config_lock = threading.Lock()
+        self.update_config(token, chat_id)
+    
+    def update_config(self, token=None, chat_id=None):
+        """
+        (Re)configure the bot credentials
+        
+        Args:
+            token (str): Bot token (default: TELEGRAM_BOT_TOKEN environment variable)
+            chat_id (str): Chat ID (default: TELEGRAM_CHAT_ID environment variable)
+        """
+        # Get credentials, falling back to environment variables
+        token = token or os.getenv("TELEGRAM_BOT_TOKEN")
+        chat_id = chat_id or os.getenv("TELEGRAM_CHAT_ID")
+        bot = None
+        enabled = False
         
         # Verify credentials
-        if not self.telegram_token or not self.telegram_chat_id:
+        if not token or not chat_id:
             self.logger.warning("Telegram credentials not configured - notifications disabled")
-            self.enabled = False
-            return
-            
-        # Initialize bot
-        try:
-            self.bot = Bot(token=self.telegram_token)
-            self.enabled = True
-            self.logger.info("Telegram notification service initialized")
-        except Exception as e:
-            self.logger.error(f"Telegram initialization failed: {str(e)}")
-            self.enabled = False
+        else:
+            # Initialize bot; the current one keeps sending until the new one is swapped in
+            try:
+                bot = Bot(token=token)
+                enabled = True
+                self.logger.info("Telegram notification service initialized")
+            except Exception as e:
+                self.logger.error(f"Telegram initialization failed: {str(e)}")
+        
+        with self._config_lock:
+            self.telegram_token = token
+            self.telegram_chat_id = chat_id
+            self.bot = bot
+            self.enabled = enabled
+    
+    def _current_bot(self):
+        """
+        Get the bot and chat ID as one consistent pair
+        
+        Returns:
+            tuple: (bot, chat_id), or (None, None) if notifications are disabled
+        """
+        with self._config_lock:
+            if not self.enabled:
+                return None, None
+            return self.bot, self.telegram_chat_id
     
     def send_message(self, message, disable_notification=False):
         """
         Send message to Telegram chat
         """
-        if not self.enabled:
+        bot, chat_id = self._current_bot()
+        if bot is None:
             self.logger.warning("Telegram notifications disabled - message not sent")
             return False
             
         try:
-            self.bot.send_message(
-                chat_id=self.telegram_chat_id,
+            bot.send_message(
+                chat_id=chat_id,
                 text=message,
                 parse_mode="HTML",
                 disable_notification=disable_notification
@@ -54,6 +101,38 @@ class TelegramNotifier:
             self.logger.error(f"Failed to send Telegram message: {str(e)}")
             return False
     
+    def enqueue(self, method, *args, **kwargs):
+        """
+        Queue a notification to be sent in the background
+        
+        Args:
+            method: Notifier method to call, e.g. self.send_message
+            *args, **kwargs: Arguments for the method
+        """
+        # Also restarts the worker in a process forked after it was started
+        if self._worker is None or not self._worker.is_alive():
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._drain_queue, name="telegram-notifier", daemon=True)
+                    self._worker.start()
+        
+        self._queue.put_nowait((method, args, kwargs))
+    
+    def _drain_queue(self):
+        """Send queued notifications in order, throttled to MAX_MESSAGES_PER_SECOND"""
+        min_interval = 1.0 / MAX_MESSAGES_PER_SECOND
+        while True:
+            method, args, kwargs = self._queue.get()
+            started = time.monotonic()
+            try:
+                method(*args, **kwargs)
+            except Exception as e:
+                self.logger.error(f"Error sending queued notification: {e}")
+            
+            elapsed = time.monotonic() - started
+            if elapsed < min_interval:
+                time.sleep(min_interval - elapsed)
+    
     def send_formatted_notification(self, title, message, status="info", disable_notification=False):
         """
         Send a beautifully formatted notification message to Telegram
@@ -64,7 +143,8 @@ class TelegramNotifier:
         - status: One of "success", "warning", "error", "info"
         - disable_notification: Whether to send silently
         """
-        if not self.enabled:
+        bot, chat_id = self._current_bot()
+        if bot is None:
             self.logger.warning("Telegram notifications disabled - message not sent")
             return False
         
@@ -97,8 +177,8 @@ class TelegramNotifier:
         )
         
         try:
-            self.bot.send_message(
-                chat_id=self.telegram_chat_id,
+            bot.send_message(
+                chat_id=chat_id,
                 text=formatted_msg,
                 parse_mode="HTML",
                 disable_notification=disable_notification
@@ -109,8 +189,8 @@ class TelegramNotifier:
             # Fallback to simple message if HTML formatting fails
             try:
                 simple_msg = f"{title}\n\n{message}\n\nTime: {timestamp}"
-                self.bot.send_message(
-                    chat_id=self.telegram_chat_id,
+                bot.send_message(
+                    chat_id=chat_id,
                     text=simple_msg,
                     disable_notification=disable_notification
                 )
@@ -318,6 +398,9 @@ class TelegramNotifier:
         test_message = "🧪 <b>Test Message</b>\n\nThis is a test message from your trading application to verify Telegram notifications are working correctly."
         return self.send_formatted_notification("Test Message", test_message)
 
+# Shared notifier for the application; call update_config() when the credentials change
+telegram_notifier = TelegramNotifier()
+
 if __name__ == "__main__":
     # No need to configure logging here since we're using the centralized logger
     
@@ -0,0 +1,79 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_storage import FileStorage
+
+
+def make_storage(data_dir):
+    """FileStorage in data_dir, without writing default settings (or their /tmp backup)"""
+    with mock.patch.object(FileStorage, "_ensure_default_settings"):
+        return FileStorage(data_dir=data_dir)
+
+
+class AlertRetentionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_restart_prunes_alert_files_past_retention(self):
+        today = date(2025, 3, 10)
+        retention_days = 7
+        old_day = today - timedelta(days=retention_days + 1)
+        kept_day = today - timedelta(days=retention_days)
+
+        storage = make_storage(self.data_dir)
+        storage.append_alert({"scan_name": "old"}, old_day)
+        storage.append_alert({"scan_name": "kept"}, kept_day)
+        storage.append_alert({"scan_name": "today"}, today)
+
+        # A fresh process reloads today's alerts on startup
+        restarted = make_storage(self.data_dir)
+        alerts = restarted.reload_alerts(today, retention_days)
+
+        self.assertEqual(alerts, [{"scan_name": "today"}])
+        self.assertFalse(os.path.exists(restarted._alerts_file(old_day)))
+        self.assertTrue(os.path.exists(restarted._alerts_file(kept_day)))
+
+
+class WriteJsonTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = make_storage(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_keeps_existing_file_mode(self):
+        path = os.path.join(self.tmp.name, "settings.json")
+        with open(path, "w") as f:
+            f.write("{}")
+        os.chmod(path, 0o644)
+
+        self.storage._write_json(path, {"DEFAULT_QUANTITY": "1"})
+
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644)
+
+    def test_new_file_follows_umask(self):
+        path = os.path.join(self.tmp.name, "new.json")
+        umask = os.umask(0)
+        os.umask(umask)
+
+        self.storage._write_json(path, {})
+
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o666 & ~umask)
+
+
+if __name__ == "__main__":
+    unittest.main()
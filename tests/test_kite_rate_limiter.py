@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kite_rate_limiter import RateLimitedKiteConnect, TokenBucket
+
+
+class FakeKite:
+    """Stands in for KiteConnect and records when each order reaches it"""
+
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def place_order(self, variety, params):
+        with self.lock:
+            self.calls.append(time.monotonic())
+        return "order"
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_consume_reserves_tokens(self):
+        bucket = TokenBucket(rate=10.0, capacity=1.0)
+        self.assertEqual(bucket.consume(), 0.0)
+        # Each caller that finds the bucket empty is queued behind the previous one
+        first_wait = bucket.consume()
+        second_wait = bucket.consume()
+        self.assertAlmostEqual(first_wait, 0.1, delta=0.02)
+        self.assertAlmostEqual(second_wait, 0.2, delta=0.02)
+
+    def test_try_consume_does_not_go_into_debt(self):
+        bucket = TokenBucket(rate=1.0, capacity=2.0)
+        self.assertTrue(bucket.try_consume())
+        self.assertTrue(bucket.try_consume())
+        for _ in range(10):
+            self.assertFalse(bucket.try_consume())
+        self.assertLess(bucket.tokens, 1.0)
+        self.assertGreaterEqual(bucket.tokens, 0.0)
+
+
+class RateLimitedKiteConnectTest(unittest.TestCase):
+
+    def test_concurrent_orders_stay_within_rate(self):
+        rate, capacity = 100.0, 2.0
+        fake = FakeKite()
+        kite = RateLimitedKiteConnect(fake, rate=rate, capacity=capacity)
+        cost = RateLimitedKiteConnect.OPERATION_COSTS['place_order']
+        workers, orders_per_worker = 8, 5
+
+        def place_orders():
+            for _ in range(orders_per_worker):
+                kite.place_order(variety="regular", params={})
+
+        threads = [threading.Thread(target=place_orders) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        calls = sorted(fake.calls)
+        self.assertEqual(len(calls), workers * orders_per_worker)
+
+        # The whole run can't be faster than the refill allows after the initial burst
+        min_duration = (len(calls) * cost - capacity) / rate
+        self.assertGreaterEqual(calls[-1] - calls[0], min_duration * 0.95)
+
+        # No window holds more calls than the burst plus what refilled during it
+        window = 0.1
+        max_in_window = int((capacity + rate * window) / cost) + 1
+        for i, start in enumerate(calls):
+            in_window = sum(1 for t in calls[i:] if t - start < window)
+            self.assertLessEqual(in_window, max_in_window)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -147,8 +147,7 @@ class TokenManager:
         """Send notification about token status"""
         try:
             # Import locally to avoid circular dependencies
-            from telegram_notifier import TelegramNotifier
-            telegram = TelegramNotifier()
+            from telegram_notifier import telegram_notifier as telegram
             
             # Skip login notification - commented out as we don't need login notifications
             if is_new:
@@ -189,8 +188,7 @@ class TokenManager:
             message += f"2. Complete the authentication process\n\n"
             
             # Import locally to avoid circular dependencies
-            from telegram_notifier import TelegramNotifier
-            telegram = TelegramNotifier()
+            from telegram_notifier import telegram_notifier as telegram
             telegram.send_message(message)
             
             logger.info(f"Sent market hours token expiry warning: {time_left_str} remaining")
@@ -9,7 +9,7 @@ import os
 import logging
 from datetime import datetime
 import pytz
-from flask import Flask, render_template_string, jsonify
+from flask import Flask, jsonify
 from token_manager import token_manager
 
 # Configure logging
@@ -240,12 +240,13 @@ TOKEN_STATUS_HTML = """
 
 def register_token_endpoints(app):
     """Register token status endpoints with the Flask app"""
+    template = app.jinja_env.from_string(TOKEN_STATUS_HTML)
     
     @app.route('/token/status')
     def token_status_page():
         """Display token status information as a web page"""
         status = token_manager.get_status_info()
-        return render_template_string(TOKEN_STATUS_HTML, status=status)
+        return template.render(status=status)
     
     @app.route('/token/status/json')
     def token_status_json():